@@ -1,7 +1,8 @@
 import sys, requests, os, ctypes, time, json, subprocess, hashlib
-from PySide6.QtCore import Qt, QThread, Signal, QTimer, QObject, QRunnable, QThreadPool, QSize, qInstallMessageHandler, QUrl
+from collections import OrderedDict
+from PySide6.QtCore import Qt, QThread, Signal, QTimer, QObject, QRunnable, QThreadPool, QSize, qInstallMessageHandler, QUrl, QBuffer, QByteArray, QIODevice
 from PySide6.QtGui import QPixmap, QImage, QFont, QColor, QIcon, QIntValidator, QDesktopServices
-from PySide6.QtWidgets import QApplication, QFrame, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QFileDialog, QInputDialog
+from PySide6.QtWidgets import QApplication, QFrame, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QFileDialog, QInputDialog, QLabel, QToolButton
 
 from qfluentwidgets import (MSFluentWindow, NavigationItemPosition, TitleLabel, 
                             CaptionLabel, SearchLineEdit, FlowLayout, SegmentedWidget, 
@@ -13,17 +14,25 @@ from qfluentwidgets import (MSFluentWindow, NavigationItemPosition, TitleLabel,
                             PushSettingCard, SettingCard, MessageBoxBase)
 
 from api_handler import TMDBService
-from database import DatabaseHandler
+from database import DatabaseHandler, get_app_folder
+from airing import collect_airing_updates
 
 # --- GLOBALS ---
 CURRENT_VERSION = "1.2.5"
 GITHUB_REPO = "xHashii/Vizen-Watchlist"
 IMAGE_CACHE = {}  
+PENDING_IMAGES = {}  # url -> ImageWorkerSignals of the fetch in flight, so a URL is only downloaded once
+DETAIL_CACHE = None  # Shared DetailCache, created on first use
+DETAIL_CACHE_SIZE = 64
+HOVER_PREFETCH_MS = 150  # How long the pointer has to rest on a card before its details are prefetched
 AMOLED_MODE = False 
+AIRING_INTERVAL = 3600000  # ms between airing tracker runs; each run only looks up shows that are due
 ACCENT_PINK = "#ff4da6"
 ACCENT_YELLOW = "#ffcc33"
+SESSION_THUMBS = 12  # Posters embedded in the session snapshot (roughly the first screen)
+SESSION_VERSION = 1  # Bump when the snapshot layout changes; older snapshots are ignored
 
-CACHE_DIR = os.path.join(os.environ['LOCALAPPDATA'], 'Vizen', 'Cache')
+CACHE_DIR = os.path.join(get_app_folder(), 'Cache')
 if not os.path.exists(CACHE_DIR): os.makedirs(CACHE_DIR)
 
 # --- UTILS ---
@@ -37,6 +46,25 @@ def resource_path(relative_path):
 def get_bg(): return "#000000" if AMOLED_MODE else "#1a1625"
 def get_card_bg(): return "#121212" if AMOLED_MODE else "#252033"
 
+# --- THEME ENGINE ---
+def build_stylesheet():
+    """One app-level sheet for every themed widget. Widgets only carry a class or objectName,
+    so a theme switch is a single parse regardless of how many cards exist."""
+    bg, card = get_bg(), get_card_bg()
+    return f"""
+VizenWindow, VizenWindow QStackedWidget {{ background: {bg}; }}
+#browseInterface, #libraryInterface, #statsView, #settingsView {{ background: {bg}; border: none; }}
+DramaCard {{ background: {card}; border: 1px solid #333; border-radius: 12px; }}
+DramaCard:hover {{ border: 1px solid {ACCENT_PINK}; }}
+QLabel#cardPoster {{ border-radius: 8px; background: #0d0d0d; }}
+QLabel#cardTitle {{ color: white; font-weight: bold; font-size: 13px; }}
+QLineEdit#episodeEdit {{ background: rgba(0,0,0,0.3); color: {ACCENT_YELLOW}; border: 1px solid #444; border-radius: 4px; }}
+HeartRating QToolButton {{ border: none; background: transparent; border-radius: 15px; }}
+HeartRating QToolButton:hover {{ background: rgba(255,77,166,0.15); }}
+"""
+
+def apply_app_theme(): QApplication.instance().setStyleSheet(build_stylesheet())
+
 def apply_font_guard(widget):
     f = QFont("Segoe UI", 10); f.setPixelSize(14)
     widget.setFont(f)
@@ -59,6 +87,56 @@ def get_cached_pixmap(url, w, h):
             return QPixmap.fromImage(scaled)
     return None
 
+# --- SESSION SNAPSHOT ---
+def encode_thumb(image):
+    buf = QBuffer(); buf.open(QIODevice.WriteOnly); image.save(buf, "JPG", 70)
+    return bytes(buf.data().toBase64()).decode()
+
+def decode_thumb(data):
+    img = QImage(); img.loadFromData(QByteArray.fromBase64(data.encode()))
+    return img
+
+def _int(v, default=0):
+    return v if isinstance(v, int) and not isinstance(v, bool) else default
+
+def _clean_item(d):
+    """Browse results are fed straight into DramaCard, so only keep entries that can build one."""
+    if not isinstance(d, dict) or not isinstance(d.get('id'), int) or not isinstance(d.get('title'), str): return None
+    if d.get('poster') is not None and not isinstance(d['poster'], str): return None
+    return d
+
+def _clean_session(s):
+    """Drops or resets every part of a snapshot that does not have the shape save_session writes."""
+    if not isinstance(s, dict) or s.get('version') != SESSION_VERSION: return {}
+    thumbs = s.get('thumbs') if isinstance(s.get('thumbs'), dict) else {}
+    out = {"thumbs": {k: v for k, v in thumbs.items() if isinstance(k, str) and isinstance(v, str)}}
+    b = s.get('browse')
+    if isinstance(b, dict):
+        results = b.get('results') if isinstance(b.get('results'), list) else []
+        out['browse'] = {"query": b['query'] if isinstance(b.get('query'), str) else None,
+                         "genre": _int(b.get('genre')), "country": _int(b.get('country')),
+                         "page": max(_int(b.get('page'), 1), 1), "total_pages": max(_int(b.get('total_pages'), 1), 1),
+                         "scroll": max(_int(b.get('scroll')), 0), "results": [d for d in map(_clean_item, results) if d]}
+    l = s.get('library')
+    if isinstance(l, dict):
+        out['library'] = {k: l[k] if isinstance(l.get(k), str) else v for k, v in
+                          (("status", "all"), ("search", ""), ("genre", "All Genres"), ("country", "All Regions"))}
+        out['library']['scroll'] = max(_int(l.get('scroll')), 0)
+    return out
+
+def load_session(path):
+    """Reads the snapshot written on exit. Returns {} if missing, corrupt or from another version."""
+    try:
+        with open(path, 'r') as f: return _clean_session(json.load(f))
+    except: return {}
+
+def save_session(path, data):
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, 'w') as f: json.dump(dict(data, version=SESSION_VERSION), f, separators=(',', ':'))
+        os.replace(tmp, path)
+    except: pass
+
 # --- UPDATER ENGINE ---
 class UpdateWorker(QThread):
     finished = Signal(str)
@@ -128,23 +206,34 @@ class MigrationWorker(QThread):
         for tid in incomplete_ids:
             detail = self.tmdb.get_detailed_info(tid)
             if detail:
-                # We fetch existing status/ep from DB so we don't overwrite them
-                cursor = self.db.conn.cursor()
-                cursor.execute("SELECT status, current_ep FROM dramas WHERE tmdb_id = ?", (tid,))
-                row = cursor.fetchone()
-                if row:
-                    status, current_ep = row
-                    self.db.add_drama(detail, status, current_ep)
+                # Only metadata columns are touched, so status/ep/rating and last_updated survive
+                self.db.update_metadata(detail)
             time.sleep(0.2) # Avoid hitting API rate limits
         self.finished.emit()
 
+class AiringWorker(QThread):
+    # Lookups happen here; the write is handed back to the UI thread via finished, because a
+    # transaction open on this thread would swallow (and could roll back) the user's own edits
+    finished = Signal(list)
+    def __init__(self, db, tmdb):
+        super().__init__()
+        self.db, self.tmdb = db, tmdb
+
+    def run(self):
+        self.finished.emit(collect_airing_updates(self.db, self.tmdb))
+
 # --- IMAGE ENGINE ---
-class ImageWorkerSignals(QObject): result = Signal(QImage, str)
+class ImageWorkerSignals(QObject): result = Signal(QImage, str); finished = Signal(str)
 class ImageWorker(QRunnable):
     def __init__(self, url, w, h):
         super().__init__(); self.url, self.w, self.h = url, w, h
         self.signals = ImageWorkerSignals()
     def run(self):
+        try: self._load()
+        finally:
+            try: self.signals.finished.emit(self.url) # Always sent, even when the fetch fails
+            except RuntimeError: pass
+    def _load(self):
         if self.url in IMAGE_CACHE: self._safe_emit(IMAGE_CACHE[self.url]); return
         url_hash = hashlib.md5(self.url.encode()).hexdigest()
         cache_path = os.path.join(CACHE_DIR, f"{url_hash}.jpg")
@@ -165,22 +254,77 @@ class ImageWorker(QRunnable):
         try: self.signals.result.emit(image, self.url)
         except RuntimeError: pass 
 
+def fetch_image(url, w, h):
+    """Starts a fetch for url, or joins the one already running. Connect to the returned signals' result."""
+    if url in PENDING_IMAGES: return PENDING_IMAGES[url]
+    worker = ImageWorker(url, w, h); PENDING_IMAGES[url] = worker.signals
+    worker.signals.finished.connect(lambda u: PENDING_IMAGES.pop(u, None))
+    QThreadPool.globalInstance().start(worker)
+    return worker.signals
+
+class SearchWorker(QThread):
+    finished = Signal(list, int)
+    def __init__(self, tmdb, query, genre, country, page=1):
+        super().__init__()
+        self.tmdb, self.query, self.genre, self.country, self.page = tmdb, query, genre, country, page
+
+    def run(self):
+        results, total = self.tmdb.search_dramas(self.query, self.genre, self.country, self.page)
+        self.finished.emit(results, total)
+
 # --- UI COMPONENTS ---
-class DetailWorker(QThread):
-    finished = Signal(dict)
-    def __init__(self, tmdb, tid): 
+class DetailWorker(QRunnable):
+    def __init__(self, tmdb, tid, cache):
         super().__init__()
-        self.tmdb, self.tid = tmdb, tid
-        
+        self.tmdb, self.tid, self.cache = tmdb, tid, cache
+
     def run(self):
         res = self.tmdb.get_detailed_info(self.tid)
-        if res:
-            if res.get('streaming'):
-                for s in res['streaming']:
-                    if s.get('logo'):
-                        worker = ImageWorker(s['logo'], 48, 48)
-                        worker.run()
-            self.finished.emit(res)
+        try: self.cache.loaded.emit(self.tid, res or {})
+        except RuntimeError: pass
+
+class DetailCache(QObject):
+    """LRU of parsed detail dicts. Hovering a card prefetches into it, clicking reads from it.
+    Fetches run on one shared pool and concurrent requests for the same show are merged."""
+    loaded = Signal(int, dict)
+    def __init__(self, tmdb, size=DETAIL_CACHE_SIZE):
+        super().__init__()
+        self.tmdb, self.size = tmdb, size
+        self.cache = OrderedDict(); self.pending = {}
+        self.pool = QThreadPool(self); self.pool.setMaxThreadCount(4)
+        self.loaded.connect(self._on_loaded)
+
+    def get(self, tid):
+        if tid in self.cache:
+            self.cache.move_to_end(tid); return self.cache[tid]
+        return None
+
+    def fetch(self, tid, callback=None):
+        d = self.get(tid)
+        if d:
+            # Deliver on the next loop pass so callers always see the same (async) behaviour
+            if callback: QTimer.singleShot(0, lambda: callback(d))
+            return
+        if tid in self.pending:
+            if callback: self.pending[tid].append(callback)
+            return
+        self.pending[tid] = [callback] if callback else []
+        self.pool.start(DetailWorker(self.tmdb, tid, self))
+
+    def _on_loaded(self, tid, d):
+        callbacks = self.pending.pop(tid, [])
+        if not d: return
+        self.cache[tid] = d; self.cache.move_to_end(tid)
+        while len(self.cache) > self.size: self.cache.popitem(last=False)
+        # Provider logos load in parallel so InfoDialog finds them in IMAGE_CACHE
+        for s in d.get('streaming', []):
+            if s.get('logo') and s['logo'] not in IMAGE_CACHE: fetch_image(s['logo'], 48, 48)
+        for cb in callbacks: cb(d)
+
+def get_detail_cache(tmdb):
+    global DETAIL_CACHE
+    if DETAIL_CACHE is None: DETAIL_CACHE = DetailCache(tmdb)
+    return DETAIL_CACHE
 
 class InfoDialog(MessageBoxBase):
     def __init__(self, d, parent=None):
@@ -224,10 +368,10 @@ class InfoDialog(MessageBoxBase):
                 if cached_pix:
                     btn.setIcon(QIcon(cached_pix))
                 else:
-                    # Fallback worker with new 48x48 size
-                    logo_worker = ImageWorker(s['logo'], 48, 48)
-                    logo_worker.signals.result.connect(lambda img, u, b=btn: b.setIcon(QIcon(QPixmap.fromImage(img))))
-                    QThreadPool.globalInstance().start(logo_worker)
+                    # Joins the fetch DetailCache already started for this logo, if any
+                    fetch_image(s['logo'], 48, 48).result.connect(lambda img, u, b=btn: b.setIcon(QIcon(QPixmap.fromImage(img))))
+                    # The fetch may have finished between the cache check and connecting
+                    if s['logo'] in IMAGE_CACHE: btn.setIcon(QIcon(QPixmap.fromImage(IMAGE_CACHE[s['logo']])))
                 
                 stream_layout.addWidget(btn)
             
@@ -265,37 +409,39 @@ class UpdateDialog(MessageBoxBase):
 
 class HeartRating(QWidget):
     valueChanged = Signal(int)
+    _icons = {}  # Filled/empty heart icons, rendered once and shared by every card
     def __init__(self, parent=None, rating=0):
         super().__init__(parent); self.rating = rating; self.hearts = []
         l = QHBoxLayout(self); l.setContentsMargins(0,0,0,0); l.setSpacing(4)
-        icon = FIF.HEART if hasattr(FIF, 'HEART') else FIF.FAVORITE
         for i in range(1, 6):
-            btn = TransparentToolButton(icon, self); btn.setFixedSize(30,30); btn.setIconSize(QSize(22,22))
+            btn = QToolButton(self); btn.setFixedSize(30,30); btn.setIconSize(QSize(22,22))
             btn.clicked.connect(lambda c, v=i: self.set_rating(v))
             self.hearts.append(btn); l.addWidget(btn)
         self.update_hearts()
+    @classmethod
+    def heart_icon(cls, filled):
+        if filled not in cls._icons:
+            icon = FIF.HEART if hasattr(FIF, 'HEART') else FIF.FAVORITE
+            cls._icons[filled] = icon.icon(color=QColor(ACCENT_PINK if filled else "#3d3654"))
+        return cls._icons[filled]
     def set_rating(self, v): self.rating = v; self.update_hearts(); self.valueChanged.emit(v)
     def update_hearts(self):
-        icon = FIF.HEART if hasattr(FIF, 'HEART') else FIF.FAVORITE
-        for i, b in enumerate(self.hearts):
-            color = ACCENT_PINK if i < self.rating else "#3d3654"
-            b.setIcon(icon.icon(color=QColor(color)))
-            b.setStyleSheet("QToolButton{border:none;background:transparent;border-radius:15px;} QToolButton:hover{background:rgba(255,77,166,0.15);}")
+        for i, b in enumerate(self.hearts): b.setIcon(self.heart_icon(i < self.rating))
 
 class DramaCard(CardWidget):
     def __init__(self, d, db, tmdb, parent=None, is_lib=False, on_refresh=None):
         super().__init__(parent=parent)
         self.db, self.tmdb, self.data, self.is_lib, self.on_refresh = db, tmdb, d, is_lib, on_refresh
-        self.setFixedSize(210, 520 if is_lib else 360); self.update_style(); self.setCursor(Qt.PointingHandCursor)
+        self.setFixedSize(210, 520 if is_lib else 360); self.setCursor(Qt.PointingHandCursor)
         l = QVBoxLayout(self); l.setContentsMargins(10,10,10,10); l.setSpacing(8)
-        self.img = BodyLabel(self); self.img.setFixedSize(190, 260); self.img.setStyleSheet("border-radius:8px;background:#0d0d0d;")
+        self.img = QLabel(self); self.img.setObjectName("cardPoster"); self.img.setFixedSize(190, 260)
         if d.get('poster'):
             w = ImageWorker(d['poster'], 190, 260); w.signals.result.connect(self._set_image_safe)
             QThreadPool.globalInstance().start(w)
         l.addWidget(self.img)
         if is_lib:
             self.pb = ProgressBar(self); self.pb.setFixedHeight(4); self.update_pb(); l.addWidget(self.pb)
-        self.title = BodyLabel(d['title'], self); self.title.setStyleSheet("color:white;font-weight:bold;font-size:13px;"); self.title.setWordWrap(True)
+        self.title = QLabel(d['title'], self); self.title.setObjectName("cardTitle"); self.title.setWordWrap(True)
         l.addWidget(self.title); l.addStretch(1)
         if is_lib:
             self.rw = HeartRating(self, d.get('rating', 0)); self.rw.valueChanged.connect(lambda v: self.db.update_rating(self.data['id'], v))
@@ -303,7 +449,7 @@ class DramaCard(CardWidget):
         self.btn = PushButton("Status" if is_lib else "Add to List", self); self.btn.clicked.connect(self.show_menu); l.addWidget(self.btn)
         if is_lib:
             h = QHBoxLayout(); self.ee = QLineEdit(str(d.get('current_ep', 0)), self); self.ee.setFixedWidth(40); self.ee.setAlignment(Qt.AlignCenter)
-            self.ee.setValidator(QIntValidator(0, 9999)); self.ee.setStyleSheet(f"background:rgba(0,0,0,0.3);color:{ACCENT_YELLOW};border:1px solid #444;border-radius:4px;")
+            self.ee.setValidator(QIntValidator(0, 9999)); self.ee.setObjectName("episodeEdit")
             self.ee.returnPressed.connect(lambda: self.up_logic(int(self.ee.text() or 0)))
             p = TransparentToolButton(FIF.ADD, self); p.clicked.connect(lambda: self.up_logic(self.data['current_ep']+1))
             h.addWidget(CaptionLabel("Ep:")); h.addWidget(self.ee); h.addWidget(CaptionLabel(f"/ {d.get('total_eps','?')}")); h.addWidget(p); l.addLayout(h)
@@ -321,12 +467,25 @@ class DramaCard(CardWidget):
             if hasattr(self, 'dbtn'): ignore.append(self.dbtn)
             if hasattr(self, 'ee'): ignore.append(self.ee)
             if clicked_widget not in ignore:
-                self.dw = DetailWorker(self.tmdb, self.data['id'])
-                self.dw.finished.connect(lambda d: InfoDialog(d, self.window()).exec())
-                self.dw.start()
+                get_detail_cache(self.tmdb).fetch(self.data['id'], self._open_info)
         super().mousePressEvent(e)
 
-    def update_style(self): self.setStyleSheet(f"DramaCard{{background:{get_card_bg()};border:1px solid #333;border-radius:12px;}} DramaCard:hover{{border:1px solid {ACCENT_PINK};}}")
+    def _open_info(self, d):
+        try: InfoDialog(d, self.window()).exec()
+        except RuntimeError: pass # Card was rebuilt while the details loaded
+
+    def enterEvent(self, e):
+        # Prefetch once the pointer rests on the card, so the click usually finds the details cached
+        if not hasattr(self, 'hover_timer'):
+            self.hover_timer = QTimer(self); self.hover_timer.setSingleShot(True)
+            self.hover_timer.timeout.connect(lambda: get_detail_cache(self.tmdb).fetch(self.data['id']))
+        self.hover_timer.start(HOVER_PREFETCH_MS)
+        super().enterEvent(e)
+
+    def leaveEvent(self, e):
+        if hasattr(self, 'hover_timer'): self.hover_timer.stop()
+        super().leaveEvent(e)
+
     def update_pb(self):
         t, c = self.data.get('total_eps', 0), self.data.get('current_ep', 0)
         self.pb.setValue(int((c/t)*100) if t > 0 else 0)
@@ -340,7 +499,7 @@ class DramaCard(CardWidget):
             self.db.update_status(self.data['id'], s, c)
             if self.on_refresh: self.on_refresh()
         else:
-            det = self.tmdb.get_detailed_info(self.data['id'])
+            det = get_detail_cache(self.tmdb).get(self.data['id']) or self.tmdb.get_detailed_info(self.data['id'])
             if det:
                 c = det['total_eps'] if s == "completed" else 0
                 self.db.add_drama(det, s, c)
@@ -372,9 +531,11 @@ class BaseInterface(QFrame):
         self.current_page = 1; self.total_pages = 1; self.is_loading_more = False
         self.last_query = None; self.last_genre = None; self.last_country = None
         self.sa.verticalScrollBar().valueChanged.connect(self._on_scroll)
-        self.queue = []; self.timer = QTimer(self); self.timer.timeout.connect(self.process)
+        self.queue = []; self.items = []; self.pending_scroll = 0; self.restoring_scroll = False
+        self.timer = QTimer(self); self.timer.timeout.connect(self.process)
 
     def _on_scroll(self, value):
+        if self.restoring_scroll: return  # Jumping back to the saved position is not the user reaching the bottom
         if value > self.sa.verticalScrollBar().maximum() * 0.9 and not self.is_loading_more:
             if self.current_page < self.total_pages: self.load_next_page()
 
@@ -386,13 +547,13 @@ class BaseInterface(QFrame):
     def start_loading(self, items, is_lib=False, cb=None, append=False):
         self.timer.stop(); self.is_lib, self.cb = is_lib, cb
         if not append:
-            self.queue = items
+            self.queue = list(items); self.items = list(items)
             while self.flow.count() > 0:
                 it = self.flow.takeAt(0)
                 w = it.widget() if hasattr(it, 'widget') else it
                 if w: w.deleteLater()
         else:
-            self.queue.extend(items)
+            self.queue.extend(items); self.items.extend(items)
         if not items and not append: self.sa.hide(); self.emptyLabel.show()
         else: self.emptyLabel.hide(); self.sa.show(); self.timer.start(5)
 
@@ -400,9 +561,18 @@ class BaseInterface(QFrame):
         if not self.queue: 
             self.timer.stop()
             self.is_loading_more = False
+            if self.pending_scroll:
+                # Wait one event loop pass so the flow layout has its final height
+                v, self.pending_scroll = self.pending_scroll, 0
+                QTimer.singleShot(0, lambda: self._restore_scroll(v))
             return
         self.flow.addWidget(DramaCard(self.queue.pop(0), self.db, self.tmdb, self.container, self.is_lib, self.cb))
 
+    def _restore_scroll(self, value):
+        self.restoring_scroll = True
+        try: self.sa.verticalScrollBar().setValue(value)
+        finally: self.restoring_scroll = False
+
 class BrowseInterface(BaseInterface):
     def __init__(self, db, tmdb, parent=None):
         super().__init__(db, tmdb, "browseInterface", parent)
@@ -419,9 +589,44 @@ class BrowseInterface(BaseInterface):
         self.sb.returnPressed.connect(lambda: self.search(self.sb.text()))
         h.addWidget(self.genreCombo); h.addWidget(self.countryCombo); h.addWidget(self.sb)
         self.header_layout.addLayout(h)
+        self.generation = 0
+
+    def session_state(self):
+        return {"query": self.last_query, "genre": self.genreCombo.currentIndex(), "country": self.countryCombo.currentIndex(),
+                "page": self.current_page, "total_pages": self.total_pages, "scroll": self.sa.verticalScrollBar().value(), "results": self.items}
+
+    def restore_state(self, s):
+        if not s: return
+        for w in (self.genreCombo, self.countryCombo, self.sb): w.blockSignals(True)
+        try:
+            for combo, i in ((self.genreCombo, s.get('genre', 0)), (self.countryCombo, s.get('country', 0))):
+                if 0 <= i < combo.count(): combo.setCurrentIndex(i)
+            self.sb.setText(s.get('query') or "")
+        finally:
+            for w in (self.genreCombo, self.countryCombo, self.sb): w.blockSignals(False)
+        self.last_query = s.get('query'); self.last_genre = self.genreCombo.currentData()
+        self.last_country = self.countryCombo.currentText() if self.countryCombo.currentText() != "All Regions" else None
+        self.current_page, self.total_pages = s.get('page', 1), s.get('total_pages', 1)
+        self.pending_scroll = s.get('scroll', 0)
+        self.start_loading(s.get('results', []))
+
+    def revalidate(self):
+        """Re-runs the restored search off the UI thread and only rebuilds if page 1 changed."""
+        if not self.items: return
+        gen = self.generation
+        self.rv = SearchWorker(self.tmdb, self.last_query, self.last_genre, self.last_country)
+        self.rv.finished.connect(lambda res, total: self._on_revalidated(gen, res, total))
+        self.rv.start()
+
+    def _on_revalidated(self, gen, results, total):
+        if gen != self.generation or not results: return  # User searched meanwhile or request failed
+        if [d['id'] for d in results] != [d['id'] for d in self.items[:len(results)]]:
+            self.current_page = 1; self.start_loading(results)
+        self.total_pages = total
 
     def search(self, q, append=False):
         if not append:
+            self.generation += 1
             self.current_page = 1; self.last_query = q
             self.last_genre = self.genreCombo.currentData()
             self.last_country = self.countryCombo.currentText() if self.countryCombo.currentText() != "All Regions" else None
@@ -456,12 +661,16 @@ class LibraryInterface(BaseInterface):
         self.header_layout.addLayout(h)
         self.piv = SegmentedWidget(self); [self.piv.addItem(k, k.title().replace('Plan', 'Plan to Watch')) for k in ["all", "watching", "plan", "completed"]]
         self.piv.setCurrentItem("all"); self.piv.currentItemChanged.connect(self.refresh); self.header_layout.addWidget(self.piv, 0, Qt.AlignLeft)
+        self.loaded_key = None
+
+    def view_key(self):
+        """Filters plus the DB revision; if unchanged, the cards on screen are still accurate."""
+        return (self.piv.currentItem().text().replace('Plan to Watch', 'plan').lower(), self.libSearch.text().lower(),
+                self.libGenreCombo.currentText(), self.libCountryCombo.currentText(), self.db.data_version())
 
     def refresh(self):
-        status = self.piv.currentItem().text().replace('Plan to Watch', 'plan').lower()
-        search_q = self.libSearch.text().lower()
-        genre_q = self.libGenreCombo.currentText()
-        country_q = self.libCountryCombo.currentText() # NEW
+        key = self.view_key()
+        status, search_q, genre_q, country_q, _ = key
         
         items = self.db.get_library(
             status_filter=status, 
@@ -469,8 +678,28 @@ class LibraryInterface(BaseInterface):
             genre_filter=genre_q, 
             country_filter=country_q
         )
+        self.loaded_key = key
         self.start_loading(items, True, self.refresh)
 
+    def refresh_if_stale(self):
+        if self.view_key() != self.loaded_key: self.refresh()
+
+    def session_state(self):
+        key = self.loaded_key or self.view_key()
+        return {"status": key[0], "search": self.libSearch.text(), "genre": key[2], "country": key[3], "scroll": self.sa.verticalScrollBar().value()}
+
+    def restore_state(self, s):
+        """Restores filters and scroll only; cards are built on first visit from the restored filters."""
+        if not s: return
+        for w in (self.libGenreCombo, self.libCountryCombo, self.libSearch, self.piv): w.blockSignals(True)
+        try:
+            self.libGenreCombo.setCurrentText(s.get('genre', "All Genres")); self.libCountryCombo.setCurrentText(s.get('country', "All Regions"))
+            self.libSearch.setText(s.get('search', ""))
+            if s.get('status') in ("all", "watching", "plan", "completed"): self.piv.setCurrentItem(s['status'])
+        finally:
+            for w in (self.libGenreCombo, self.libCountryCombo, self.libSearch, self.piv): w.blockSignals(False)
+        self.pending_scroll = s.get('scroll', 0)
+
     def export_data(self):
         path, _ = QFileDialog.getSaveFileName(self, "Export Backup", "", "JSON (*.json)")
         if path: self.db.export_data(path); InfoBar.success("Export Successful", f"Saved to {os.path.basename(path)}", duration=3000, parent=self.window())
@@ -481,10 +710,44 @@ class LibraryInterface(BaseInterface):
             if self.db.import_data(path): self.refresh(); InfoBar.success("Import Successful", "Library updated.", duration=3000, parent=self.window())
             else: InfoBar.error("Import Failed", "Invalid JSON file.", duration=3000, parent=self.window())
 
+class StatsInterface(SmoothScrollArea):
+    def __init__(self, db, parent=None):
+        super().__init__(parent=parent); self.db = db; self.setObjectName("statsInterface")
+        self.setWidgetResizable(True); self.setStyleSheet("background:transparent;border:none;")
+        self.loaded_version = None; self.refresh()
+
+    def refresh(self):
+        # get_stats only reads the trigger-maintained aggregates, so this is cheap for any library size
+        if self.loaded_version == self.db.data_version(): return
+        self.loaded_version = self.db.data_version(); st = self.db.get_stats(days=14)
+        self.view = QWidget(); self.view.setObjectName("statsView"); l = QVBoxLayout(self.view); l.setContentsMargins(30,30,30,30); l.setSpacing(12)
+        l.addWidget(TitleLabel("Library Stats"))
+        l.addWidget(BodyLabel(f"{st['total']} dramas  •  {st['eps_watched']} episodes watched  •  "
+                              f"{st['completion_rate']*100:.0f}% completed  •  {st['episode_progress']*100:.0f}% of all episodes seen"))
+        bs = st['by_status']
+        self.add_section(l, "By Status", [(k.title().replace('Plan', 'Plan to Watch'), bs.get(k, {}).get('count', 0)) for k in ["watching", "plan", "completed"]], st['total'])
+        self.add_section(l, "Episode Progress", [(k.title().replace('Plan', 'Plan to Watch'), bs[k]['eps_watched'], bs[k]['eps_total']) for k in ["watching", "plan", "completed"] if k in bs])
+        self.add_section(l, "Genres", st['genres'][:10], st['total'])
+        self.add_section(l, "Regions", [(c or "Unknown", n) for c, n in st['countries'][:10]], st['total'])
+        self.add_section(l, "Ratings", [("♥" * r if r else "Unrated", st['ratings'].get(r, 0)) for r in range(5, -1, -1)], st['total'])
+        act = st['activity']
+        self.add_section(l, "Activity (last 14 days)", [(a['day'], a['eps_watched'], max([x['eps_watched'] for x in act] + [1])) for a in act], suffix=" eps")
+        l.addStretch(1); self.setWidget(self.view); apply_font_guard(self.view)
+
+    def add_section(self, l, title, rows, total=None, suffix=""):
+        """rows are (label, value) against total, or (label, value, max) for per-row maximums."""
+        l.addWidget(SubtitleLabel(title))
+        if not rows: l.addWidget(CaptionLabel("Nothing here yet.")); return
+        for r in rows:
+            label, value, top = r if len(r) == 3 else (r[0], r[1], total)
+            h = QHBoxLayout(); name = BodyLabel(str(label)); name.setFixedWidth(180)
+            pb = ProgressBar(); pb.setFixedHeight(6); pb.setValue(int(value / top * 100) if top else 0)
+            h.addWidget(name); h.addWidget(pb, 1); h.addWidget(CaptionLabel(f"{value}{suffix}" if len(r) == 2 or suffix else f"{value} / {top}")); l.addLayout(h)
+
 class SettingsInterface(SmoothScrollArea):
     def __init__(self, db, parent=None):
         super().__init__(parent=parent); self.db = db; self.setObjectName("settingsInterface")
-        self.view = QWidget(); l = QVBoxLayout(self.view); l.setContentsMargins(30,30,30,30); l.setSpacing(20)
+        self.view = QWidget(); self.view.setObjectName("settingsView"); l = QVBoxLayout(self.view); l.setContentsMargins(30,30,30,30); l.setSpacing(20)
         self.setWidget(self.view); self.setWidgetResizable(True); self.setStyleSheet("background:transparent;border:none;")
         g1 = SettingCardGroup("About", self.view); l.addWidget(g1)
         g1.addSettingCard(SettingCard(FIF.INFO, "Version", f"Current: {CURRENT_VERSION}"))
@@ -521,27 +784,65 @@ class VizenWindow(MSFluentWindow):
         super().__init__(); setTheme(Theme.DARK); self.db, self.tmdb = DatabaseHandler(), TMDBService()
         QThreadPool.globalInstance().setMaxThreadCount(8)
         self.browse, self.library, self.settings = BrowseInterface(self.db, self.tmdb), LibraryInterface(self.db, self.tmdb), SettingsInterface(self.db, self)
+        self.stats = StatsInterface(self.db, self)
         self.addSubInterface(self.browse, FIF.SEARCH, "Browse")
         self.addSubInterface(self.library, FIF.VIDEO, "Library")
+        self.addSubInterface(self.stats, FIF.PIE_SINGLE if hasattr(FIF, 'PIE_SINGLE') else FIF.INFO, "Stats")
         self.addSubInterface(self.settings, FIF.SETTING, "Settings", position=NavigationItemPosition.BOTTOM)
         logo = resource_path("logo.png")
         if os.path.exists(logo): self.setWindowIcon(QIcon(logo))
         self.setWindowTitle("Vizen Watchlist"); self.resize(1300, 850); self.center(); self.apply_theme()
-        self.stackedWidget.currentChanged.connect(lambda i: self.library.refresh() if i==1 else None)
+        self.session_path = os.path.join(self.db.app_folder, "session.json")
+        self.restore_session()
+        self.stackedWidget.currentChanged.connect(self.on_tab_changed)
         self.check_updates()
         self.run_migration()
+        self.airing_timer = QTimer(self); self.airing_timer.timeout.connect(self.run_airing); self.airing_timer.start(AIRING_INTERVAL)
+        QTimer.singleShot(30000, self.run_airing) # First pass once startup traffic has settled
+    def run_airing(self):
+        if getattr(self, 'airing', None) and self.airing.isRunning(): return
+        self.airing = AiringWorker(self.db, self.tmdb)
+        self.airing.finished.connect(self.apply_airing)
+        self.airing.start()
+    def apply_airing(self, updates):
+        if updates and self.db.apply_airing_updates(updates) and self.stackedWidget.currentWidget() is self.library:
+            self.library.refresh_if_stale()
+    def on_tab_changed(self, i):
+        w = self.stackedWidget.currentWidget()
+        if w is self.library: self.library.refresh_if_stale()
+        elif w is self.stats: self.stats.refresh()
+    def restore_session(self):
+        # Runs before any network call or library query so the first frame already has content
+        s = load_session(self.session_path)
+        try:
+            for url, data in s.get('thumbs', {}).items():
+                img = decode_thumb(data)
+                if not img.isNull(): IMAGE_CACHE.setdefault(url, img)
+            self.browse.restore_state(s.get('browse')); self.library.restore_state(s.get('library'))
+        except Exception:
+            # A snapshot should never keep the window from opening; start as if there was none
+            self.browse.start_loading([]); self.browse.current_page = self.browse.total_pages = 1
+            self.browse.pending_scroll = self.library.pending_scroll = 0
+            return
+        QTimer.singleShot(0, self.browse.revalidate)
+    def save_session(self):
+        thumbs = {}
+        for iface in (self.browse, self.library):
+            for d in iface.items[:SESSION_THUMBS]:
+                img = IMAGE_CACHE.get(d.get('poster'))
+                if img is not None: thumbs[d['poster']] = encode_thumb(img)
+        save_session(self.session_path, {"browse": self.browse.session_state(), "library": self.library.session_state(), "thumbs": thumbs})
+    def closeEvent(self, e):
+        self.save_session(); super().closeEvent(e)
     def run_migration(self):
         self.migrator = MigrationWorker(self.db, self.tmdb)
         # Refresh library once migration finishes so user sees the updated data
-        self.migrator.finished.connect(lambda: self.library.refresh())
+        self.migrator.finished.connect(lambda: self.library.refresh_if_stale())
         self.migrator.start()
     def center(self):
         cp = QApplication.primaryScreen().availableGeometry().center()
         qr = self.frameGeometry(); qr.moveCenter(cp); self.move(qr.topLeft())
-    def apply_theme(self):
-        bg = get_bg(); self.setStyleSheet(f"MSFluentWindow, QStackedWidget {{ background: {bg}; }}")
-        [x.setStyleSheet(f"background:{bg};border:none;") for x in [self.browse, self.library, self.settings.view]]
-        for c in self.findChildren(DramaCard): c.update_style()
+    def apply_theme(self): apply_app_theme()
     def check_updates(self):
         self.checker = UpdateChecker(self); self.checker.update_available.connect(self.prompt_update); self.checker.start()
     def prompt_update(self, v, u):
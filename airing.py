@@ -0,0 +1,38 @@
+"""Airing tracker: keeps total_eps current for watching/plan shows that are still on air.
+
+Each show gets a local next-check time from its TMDB status and next episode date,
+so a run only looks up the few shows that are actually due.
+"""
+import time
+
+DAY = 86400
+
+def next_check(info, now):
+    if info is None: return now + DAY // 4  # Lookup failed, retry in 6 hours
+    if info['status'] in ("Ended", "Canceled"): return now + 30 * DAY
+    if info.get('next_air_date'):
+        try: aired = int(time.mktime(time.strptime(info['next_air_date'], "%Y-%m-%d")))
+        except ValueError: aired = None
+        # Check the day after the next episode airs, but never more often than every 6 hours
+        if aired: return max(aired + DAY, now + DAY // 4)
+    return now + 3 * DAY  # Still running, no date announced yet
+
+def collect_airing_updates(db, tmdb, limit=40, now=None):
+    """Looks up at most `limit` due shows. Only reads the database; returns the rows for
+    db.apply_airing_updates, so callers can do the write on the thread that owns the connection."""
+    now = int(now or time.time())
+    due = db.get_airing_due(now, limit)
+    if not due or not tmdb.token: return []
+    infos = tmdb.get_airing_batch(due)
+    updates = []
+    for tid in due:
+        info = infos.get(tid)
+        updates.append((tid, info['total_eps'] if info else None, next_check(info, now),
+                        info['status'] if info else None, info.get('next_air_date') if info else None))
+    return updates
+
+def refresh_airing(db, tmdb, limit=40, now=None):
+    """Looks up the due shows and writes the results in one transaction.
+    Returns how many shows got a new episode count."""
+    updates = collect_airing_updates(db, tmdb, limit, now)
+    return db.apply_airing_updates(updates) if updates else 0
@@ -1,4 +1,4 @@
-import requests, json, os, sys
+import requests, json, os, sys, time
 
 class TMDBService:
     def __init__(self):
@@ -92,4 +92,26 @@ class TMDBService:
                 "year": data.get('first_air_date', '????')[:4], 
                 "streaming": streaming
             }
-        except: return None
\ No newline at end of file
+        except: return None
+
+    def get_airing_info(self, tmdb_id):
+        """Lightweight lookup (no credits/providers) used by the airing tracker."""
+        try:
+            res = self.session.get(f"{self.base_url}/tv/{tmdb_id}", params={"language": "en-US"}, headers=self.headers, timeout=10)
+            data = res.json()
+            nxt = data.get('next_episode_to_air') or {}
+            return {
+                "id": data['id'],
+                "total_eps": data.get('number_of_episodes') or 0,
+                "status": data.get('status', ''), # "Returning Series", "Ended", "Canceled", ...
+                "next_air_date": nxt.get('air_date')
+            }
+        except: return None
+
+    def get_airing_batch(self, ids, min_interval=0.25):
+        """Looks up several shows in a row, spaced out to stay well under TMDB's rate limit."""
+        out = {}
+        for i, tid in enumerate(ids):
+            if i: time.sleep(min_interval)
+            out[tid] = self.get_airing_info(tid)
+        return out
\ No newline at end of file
@@ -3,22 +3,130 @@ import json
 import time
 import os
 import sys
+from contextlib import contextmanager
+
+def get_app_folder():
+    # Universal path logic
+    if sys.platform == 'win32':
+        return os.path.join(os.environ['LOCALAPPDATA'], 'Vizen')
+    elif sys.platform == 'darwin': # macOS
+        return os.path.expanduser('~/Library/Application Support/Vizen')
+    return os.path.expanduser('~/.local/share/Vizen') # Linux
+
+def _genre_rows(row):
+    # genres is stored as "A,B,C" and may come from user-supplied imports, so it is JSON-escaped
+    # before building the array. Anything still invalid (rare control characters) counts as no
+    # genres rather than failing the write; add and remove use the same expression, so counts stay balanced.
+    # A genre listed twice ("Drama,Drama") may repeat here, so callers count each distinct value once.
+    esc = f"""replace(replace({row}.genres, '\\', '\\\\'), '"', '\\"')"""
+    esc = f"""replace(replace(replace({esc}, char(9), '\\t'), char(10), '\\n'), char(13), '\\r')"""
+    arr = f"""'["' || replace({esc}, ',', '","') || '"]'"""
+    return f"json_each(CASE WHEN json_valid({arr}) THEN {arr} ELSE '[]' END)"
+
+# Trigger bodies use UPSERT rather than INSERT OR IGNORE: an outer INSERT OR REPLACE (add_drama)
+# overrides the conflict clause of every statement inside the trigger, but not an upsert.
+def _stats_add_sql(row):
+    """Statements that count one dramas row into every aggregate table."""
+    return f'''
+        INSERT INTO stats_status (status, count, eps_watched, eps_total) VALUES ({row}.status, 1, COALESCE({row}.current_ep, 0), COALESCE({row}.total_eps, 0))
+            ON CONFLICT(status) DO UPDATE SET count = count + 1, eps_watched = eps_watched + excluded.eps_watched, eps_total = eps_total + excluded.eps_total;
+        INSERT INTO stats_country (country, count) VALUES (COALESCE({row}.origin_country, ''), 1) ON CONFLICT(country) DO UPDATE SET count = count + 1;
+        INSERT INTO stats_rating (rating, count) VALUES (COALESCE({row}.rating, 0), 1) ON CONFLICT(rating) DO UPDATE SET count = count + 1;
+        INSERT INTO stats_genre (genre, count) SELECT DISTINCT value, 1 FROM {_genre_rows(row)} WHERE {row}.genres <> ''
+            ON CONFLICT(genre) DO UPDATE SET count = count + 1;'''
+
+def _stats_remove_sql(row):
+    """Statements that take one dramas row back out of every aggregate table."""
+    return f'''
+        UPDATE stats_status SET count = count - 1, eps_watched = eps_watched - COALESCE({row}.current_ep, 0),
+            eps_total = eps_total - COALESCE({row}.total_eps, 0) WHERE status = {row}.status;
+        UPDATE stats_country SET count = count - 1 WHERE country = COALESCE({row}.origin_country, '');
+        UPDATE stats_rating SET count = count - 1 WHERE rating = COALESCE({row}.rating, 0);
+        UPDATE stats_genre SET count = count - 1 WHERE {row}.genres <> '' AND genre IN (SELECT value FROM {_genre_rows(row)});'''
+
+_ACTIVITY_DAY = "date(NEW.last_updated, 'unixepoch', 'localtime')"
+_ACTIVITY_PRUNE = "DELETE FROM activity_log WHERE day < date('now', '-365 days');"
+
+STATS_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS stats_status (status TEXT PRIMARY KEY, count INTEGER DEFAULT 0, eps_watched INTEGER DEFAULT 0, eps_total INTEGER DEFAULT 0);
+    CREATE TABLE IF NOT EXISTS stats_genre (genre TEXT PRIMARY KEY, count INTEGER DEFAULT 0);
+    CREATE TABLE IF NOT EXISTS stats_country (country TEXT PRIMARY KEY, count INTEGER DEFAULT 0);
+    CREATE TABLE IF NOT EXISTS stats_rating (rating INTEGER PRIMARY KEY, count INTEGER DEFAULT 0);
+    CREATE TABLE IF NOT EXISTS activity_log (day TEXT PRIMARY KEY, updates INTEGER DEFAULT 0, eps_watched INTEGER DEFAULT 0, completed INTEGER DEFAULT 0);
+
+    -- Triggers are recreated on every start so existing databases pick up changes to them
+    DROP TRIGGER IF EXISTS stats_ai; DROP TRIGGER IF EXISTS stats_ad; DROP TRIGGER IF EXISTS stats_au; DROP TRIGGER IF EXISTS activity_au;
+    CREATE TRIGGER stats_ai AFTER INSERT ON dramas BEGIN
+        {_stats_add_sql("NEW")}
+        INSERT INTO activity_log (day, updates, completed) VALUES ({_ACTIVITY_DAY}, 1, NEW.status = 'completed')
+            ON CONFLICT(day) DO UPDATE SET updates = updates + 1, completed = completed + excluded.completed;
+        {_ACTIVITY_PRUNE}
+    END;
+    CREATE TRIGGER stats_ad AFTER DELETE ON dramas BEGIN
+        {_stats_remove_sql("OLD")}
+    END;
+    CREATE TRIGGER stats_au AFTER UPDATE OF status, current_ep, total_eps, rating, genres, origin_country ON dramas BEGIN
+        {_stats_remove_sql("OLD")}
+        {_stats_add_sql("NEW")}
+    END;
+    -- last_updated only has one-second resolution, so episode changes are matched directly as well
+    CREATE TRIGGER activity_au AFTER UPDATE ON dramas
+    WHEN NEW.last_updated IS NOT OLD.last_updated OR NEW.current_ep IS NOT OLD.current_ep
+        OR (NEW.status = 'completed' AND OLD.status <> 'completed') BEGIN
+        INSERT INTO activity_log (day, updates, eps_watched, completed)
+            VALUES ({_ACTIVITY_DAY}, 1, MAX(COALESCE(NEW.current_ep, 0) - COALESCE(OLD.current_ep, 0), 0), NEW.status = 'completed' AND OLD.status <> 'completed')
+            ON CONFLICT(day) DO UPDATE SET updates = updates + 1, eps_watched = eps_watched + excluded.eps_watched, completed = completed + excluded.completed;
+        {_ACTIVITY_PRUNE}
+    END;
+'''
+
+# One entry per drama (older ones are dropped), so a delta never holds more than the rows it touches.
+# Upserts carry the row's last_updated; tombstones carry the deletion time.
+_CHANGELOG_SQL = "DELETE FROM changelog WHERE tmdb_id = {row}.tmdb_id; INSERT INTO changelog (tmdb_id, op, ts) VALUES ({row}.tmdb_id, '{op}', {ts});"
+
+CHANGELOG_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS changelog (seq INTEGER PRIMARY KEY AUTOINCREMENT, tmdb_id INTEGER UNIQUE, op TEXT, ts INTEGER);
+    CREATE TRIGGER IF NOT EXISTS changelog_ai AFTER INSERT ON dramas BEGIN
+        {_CHANGELOG_SQL.format(row="NEW", op="upsert", ts="NEW.last_updated")}
+    END;
+    DROP TRIGGER IF EXISTS changelog_au;
+    -- Only user-facing fields count as a change; metadata refreshes stay out of deltas
+    CREATE TRIGGER changelog_au AFTER UPDATE ON dramas
+    WHEN NEW.last_updated IS NOT OLD.last_updated OR NEW.status IS NOT OLD.status
+        OR NEW.current_ep IS NOT OLD.current_ep OR NEW.rating IS NOT OLD.rating BEGIN
+        {_CHANGELOG_SQL.format(row="NEW", op="upsert", ts="NEW.last_updated")}
+    END;
+    CREATE TRIGGER IF NOT EXISTS changelog_ad AFTER DELETE ON dramas BEGIN
+        {_CHANGELOG_SQL.format(row="OLD", op="delete", ts="CAST(strftime('%s', 'now') AS INTEGER)")}
+    END;
+'''
+
+# Bumped whenever a dramas row visibly changes, from any connection. Views compare it to skip rebuilds;
+# writes to other tables (airing_schedule, changelog) and no-op updates leave it alone.
+_REVISION_SQL = "UPDATE dramas_revision SET n = n + 1;"
+_DRAMAS_COLUMNS = ["title", "poster_url", "status", "current_ep", "total_eps", "year", "rating", "last_updated", "genres", "origin_country"]
+
+REVISION_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS dramas_revision (n INTEGER NOT NULL);
+    INSERT INTO dramas_revision (n) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM dramas_revision);
+    DROP TRIGGER IF EXISTS revision_ai; DROP TRIGGER IF EXISTS revision_ad; DROP TRIGGER IF EXISTS revision_au;
+    CREATE TRIGGER revision_ai AFTER INSERT ON dramas BEGIN {_REVISION_SQL} END;
+    CREATE TRIGGER revision_ad AFTER DELETE ON dramas BEGIN {_REVISION_SQL} END;
+    CREATE TRIGGER revision_au AFTER UPDATE ON dramas
+    WHEN {" OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in _DRAMAS_COLUMNS)} BEGIN {_REVISION_SQL} END;
+'''
 
 class DatabaseHandler:
     def __init__(self):
-        # Universal path logic
-        if sys.platform == 'win32':
-            self.app_folder = os.path.join(os.environ['LOCALAPPDATA'], 'Vizen')
-        elif sys.platform == 'darwin': # macOS
-            self.app_folder = os.path.expanduser('~/Library/Application Support/Vizen')
-        else: # Linux
-            self.app_folder = os.path.expanduser('~/.local/share/Vizen')
-
+        self.app_folder = get_app_folder()
+        self._batch_depth = 0
         if not os.path.exists(self.app_folder):
             os.makedirs(self.app_folder)
             
         db_path = os.path.join(self.app_folder, "dramas.db")
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # INSERT OR REPLACE only fires the DELETE triggers (keeping stats exact) with this on
+        self.conn.execute("PRAGMA recursive_triggers = ON")
         self.create_table()
 
     def create_table(self):
@@ -44,6 +152,70 @@ class DatabaseHandler:
         except: pass
         self.conn.commit()
 
+        # Aggregates for the Stats page, kept current by triggers
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_status'")
+        fresh_stats = cursor.fetchone() is None
+        cursor.executescript(STATS_SCHEMA)
+        if fresh_stats: self.rebuild_stats()
+
+        # Change log for incremental sync; seeded with the current rows on first run
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'changelog'")
+        fresh_log = cursor.fetchone() is None
+        cursor.executescript(CHANGELOG_SCHEMA)
+        if fresh_log:
+            cursor.execute("INSERT INTO changelog (tmdb_id, op, ts) SELECT tmdb_id, 'upsert', last_updated FROM dramas ORDER BY last_updated")
+            self.conn.commit()
+
+        cursor.executescript(REVISION_SCHEMA)
+
+        # Airing tracker: when each show next needs a TMDB lookup
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS airing_schedule (
+                tmdb_id INTEGER PRIMARY KEY, next_check INTEGER DEFAULT 0,
+                tmdb_status TEXT DEFAULT "", next_air_date TEXT
+            )
+        ''')
+        self.conn.commit()
+
+    def rebuild_stats(self):
+        """Full recount of the aggregate tables. Only needed once, for libraries created before they existed."""
+        cursor = self.conn.cursor()
+        for t in ["stats_status", "stats_genre", "stats_country", "stats_rating", "activity_log"]:
+            cursor.execute(f"DELETE FROM {t}")
+        cursor.execute('''INSERT INTO stats_status (status, count, eps_watched, eps_total)
+            SELECT status, COUNT(*), SUM(COALESCE(current_ep, 0)), SUM(COALESCE(total_eps, 0)) FROM dramas GROUP BY status''')
+        cursor.execute("INSERT INTO stats_country (country, count) SELECT COALESCE(origin_country, ''), COUNT(*) FROM dramas GROUP BY 1")
+        cursor.execute("INSERT INTO stats_rating (rating, count) SELECT COALESCE(rating, 0), COUNT(*) FROM dramas GROUP BY 1")
+        cursor.execute(f"INSERT INTO stats_genre (genre, count) SELECT g.value, COUNT(DISTINCT NEW.tmdb_id) FROM dramas AS NEW, {_genre_rows('NEW')} AS g WHERE NEW.genres <> '' GROUP BY g.value")
+        cursor.execute('''INSERT INTO activity_log (day, updates, completed)
+            SELECT date(last_updated, 'unixepoch', 'localtime'), COUNT(*), SUM(status = 'completed') FROM dramas WHERE last_updated > 0 GROUP BY 1''')
+        self.conn.commit()
+
+    def get_stats(self, days=30):
+        """Reads the precomputed aggregates; cost does not depend on library size."""
+        cur = self.conn.cursor()
+        cur.execute("SELECT status, count, eps_watched, eps_total FROM stats_status WHERE count > 0")
+        by_status = {r[0]: {"count": r[1], "eps_watched": r[2], "eps_total": r[3]} for r in cur.fetchall()}
+        total = sum(s["count"] for s in by_status.values())
+        eps_watched = sum(s["eps_watched"] for s in by_status.values())
+        eps_total = sum(s["eps_total"] for s in by_status.values())
+        cur.execute("SELECT genre, count FROM stats_genre WHERE count > 0 ORDER BY count DESC, genre")
+        genres = cur.fetchall()
+        cur.execute("SELECT country, count FROM stats_country WHERE count > 0 ORDER BY count DESC, country")
+        countries = cur.fetchall()
+        cur.execute("SELECT rating, count FROM stats_rating WHERE count > 0")
+        ratings = dict(cur.fetchall())
+        cur.execute("SELECT day, updates, eps_watched, completed FROM activity_log WHERE day >= date('now', 'localtime', ?) ORDER BY day",
+                    (f"-{days - 1} days",))  # Days are local dates; today counts as one of them
+        activity = [{"day": r[0], "updates": r[1], "eps_watched": r[2], "completed": r[3]} for r in cur.fetchall()]
+        return {
+            "total": total, "by_status": by_status, "genres": genres, "countries": countries, "ratings": ratings,
+            "eps_watched": eps_watched, "eps_total": eps_total,
+            "completion_rate": by_status.get("completed", {}).get("count", 0) / total if total else 0,
+            "episode_progress": eps_watched / eps_total if eps_total else 0,
+            "activity": activity
+        }
+
     def get_library(self, status_filter="all", search_q="", genre_filter="All Genres", country_filter="All Regions"):
         cur = self.conn.cursor()
         query = "SELECT * FROM dramas"
@@ -68,39 +240,78 @@ class DatabaseHandler:
             
         query += " ORDER BY last_updated DESC"
         cur.execute(query, params)
+        return [self._row_dict(d) for d in cur.fetchall()]
+
+    @staticmethod
+    def _row_dict(d):
         # Note: origin_country is index 10
-        return [{"id": d[0], "title": d[1], "poster": d[2], "status": d[3], 
+        return {"id": d[0], "title": d[1], "poster": d[2], "status": d[3], 
                 "current_ep": d[4], "total_eps": d[5], "year": d[6], 
-                "rating": d[7], "genres": d[9], "country": d[10]} for d in cur.fetchall()]
+                "rating": d[7], "genres": d[9], "country": d[10], "last_updated": d[8]}
+
+    @contextmanager
+    def batch(self):
+        """Groups many mutations into one transaction instead of committing each row."""
+        self._batch_depth += 1
+        try: yield self
+        except:
+            self.conn.rollback(); raise
+        finally: self._batch_depth -= 1
+        if not self._batch_depth: self.conn.commit()
+
+    def _commit(self):
+        if not self._batch_depth: self.conn.commit()
+
+    def data_version(self):
+        """Cheap way for views to tell if their data went stale. Only moves when the library itself changes,
+        including commits from another connection (e.g. vizen_cli.py)."""
+        return self.conn.execute("SELECT n FROM dramas_revision").fetchone()[0]
 
     def update_rating(self, tmdb_id, rating):
         cursor = self.conn.cursor()
-        cursor.execute('UPDATE dramas SET rating = ? WHERE tmdb_id = ?', (rating, tmdb_id))
-        self.conn.commit()
+        # Bumps last_updated too, otherwise a rating change would lose to any older edit when syncing
+        cursor.execute('UPDATE dramas SET rating = ?, last_updated = ? WHERE tmdb_id = ?', (rating, int(time.time()), tmdb_id))
+        self._commit()
 
-    def add_drama(self, d, status, current_ep=0):
-        cursor = self.conn.cursor()
-        genres_str = ",".join(d.get('genres', []))
+    @staticmethod
+    def _genres_country(d):
+        # API data has a genre list; exported library rows already hold the joined string
+        genres = d.get('genres', [])
+        genres_str = genres if isinstance(genres, str) else ",".join(genres)
         # Extract country from API data (TMDB returns a list)
-        country = d.get('origin_country', [""])[0] if isinstance(d.get('origin_country'), list) else d.get('origin_country', "")
+        country = d.get('origin_country', [""])[0] if isinstance(d.get('origin_country'), list) else d.get('origin_country', d.get('country', ""))
+        return genres_str, country
+
+    def add_drama(self, d, status, current_ep=0, last_updated=None):
+        cursor = self.conn.cursor()
+        genres_str, country = self._genres_country(d)
         
         cursor.execute('''
-            INSERT OR REPLACE INTO dramas (tmdb_id, title, poster_url, status, current_ep, total_eps, year, last_updated, genres, origin_country)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (d['id'], d['title'], d['poster'], status, current_ep, d.get('total_eps', 0), d['year'], int(time.time()), genres_str, country))
-        self.conn.commit()
+            INSERT OR REPLACE INTO dramas (tmdb_id, title, poster_url, status, current_ep, total_eps, year, rating, last_updated, genres, origin_country)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (d['id'], d['title'], d['poster'], status, current_ep, d.get('total_eps', 0), d['year'], d.get('rating', 0), last_updated or int(time.time()), genres_str, country))
+        self._commit()
+
+    def update_metadata(self, d):
+        """Refreshes the TMDB-sourced columns of an existing row. Status, progress, rating and
+        last_updated stay as they are, so a refresh is never treated as a user edit (stats, sync, ordering)."""
+        cursor = self.conn.cursor()
+        genres_str, country = self._genres_country(d)
+        cursor.execute('''UPDATE dramas SET title = ?, poster_url = ?, total_eps = ?, year = ?, genres = ?, origin_country = ?
+            WHERE tmdb_id = ?''', (d['title'], d['poster'], d.get('total_eps', 0), d['year'], genres_str, country, d['id']))
+        self._commit()
 
     def update_episode(self, tmdb_id, new_ep):
         cursor = self.conn.cursor()
         cursor.execute('UPDATE dramas SET current_ep = ?, last_updated = ? WHERE tmdb_id = ?', 
                        (new_ep, int(time.time()), tmdb_id))
-        self.conn.commit()
+        self._commit()
 
     def update_status(self, tmdb_id, status, current_ep):
         cursor = self.conn.cursor()
         cursor.execute('UPDATE dramas SET status = ?, current_ep = ?, last_updated = ? WHERE tmdb_id = ?', 
                        (status, current_ep, int(time.time()), tmdb_id))
-        self.conn.commit()
+        self._commit()
 
     def get_incomplete_dramas(self):
         cursor = self.conn.cursor()
@@ -108,19 +319,93 @@ class DatabaseHandler:
         cursor.execute("SELECT tmdb_id FROM dramas WHERE genres = '' OR origin_country = '' OR origin_country IS NULL")
         return [row[0] for row in cursor.fetchall()]
 
+    def get_airing_due(self, now, limit=40, statuses=("watching", "plan")):
+        """Shows in `statuses` whose next check time has passed (never-checked ones first)."""
+        cursor = self.conn.cursor()
+        cursor.execute(f'''SELECT d.tmdb_id FROM dramas d LEFT JOIN airing_schedule a ON a.tmdb_id = d.tmdb_id
+            WHERE d.status IN ({",".join("?" * len(statuses))}) AND COALESCE(a.next_check, 0) <= ?
+            ORDER BY COALESCE(a.next_check, 0) LIMIT ?''', (*statuses, now, limit))
+        return [row[0] for row in cursor.fetchall()]
+
+    def apply_airing_updates(self, updates):
+        """updates: (tmdb_id, total_eps or None, next_check, tmdb_status, next_air_date) tuples.
+        Writes everything in one transaction, touching total_eps only where it changed. Returns that count."""
+        changed = 0
+        with self.batch():
+            cursor = self.conn.cursor()
+            for tid, total, next_check, tmdb_status, next_air in updates:
+                if total:
+                    cursor.execute('UPDATE dramas SET total_eps = ? WHERE tmdb_id = ? AND total_eps IS NOT ?', (total, tid, total))
+                    changed += cursor.rowcount
+                cursor.execute('''INSERT INTO airing_schedule (tmdb_id, next_check, tmdb_status, next_air_date) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(tmdb_id) DO UPDATE SET next_check = excluded.next_check,
+                    tmdb_status = COALESCE(excluded.tmdb_status, tmdb_status), next_air_date = excluded.next_air_date''',
+                    (tid, next_check, tmdb_status, next_air))
+        return changed
+
     def delete_drama(self, tmdb_id):
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM dramas WHERE tmdb_id = ?', (tmdb_id,))
-        self.conn.commit()
+        cursor.execute('DELETE FROM airing_schedule WHERE tmdb_id = ?', (tmdb_id,))
+        self._commit()
 
     def import_data(self, path):
         try:
             with open(path, 'r') as f: data = json.load(f)
-            for d in data:
-                self.add_drama(d, d['status'], d.get('current_ep', 0))
+            with self.batch():
+                for d in data:
+                    # Backups that carry last_updated merge like a delta instead of overwriting newer edits
+                    if d.get('last_updated'): self._merge_change({"op": "upsert", "ts": d['last_updated'], "drama": d})
+                    else: self.add_drama(d, d['status'], d.get('current_ep', 0))
             return True
         except: return False
 
+    def change_seq(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog")
+        return cursor.fetchone()[0]
+
+    def export_changes(self, path, since=0):
+        """Writes every change after sequence `since` as a compact delta file.
+        Returns the current sequence, to pass as `since` on the next export."""
+        cursor = self.conn.cursor()
+        cursor.execute('''SELECT c.seq, c.tmdb_id, c.op, c.ts, d.* FROM changelog c
+            LEFT JOIN dramas d ON d.tmdb_id = c.tmdb_id WHERE c.seq > ? ORDER BY c.seq''', (since,))
+        changes, seq = [], since
+        for r in cursor.fetchall():
+            seq = r[0]
+            if r[2] == "delete": changes.append({"op": "delete", "ts": r[3], "id": r[1]})
+            elif r[4] is not None: changes.append({"op": "upsert", "ts": r[3], "drama": self._row_dict(r[4:])})
+        with open(path, 'w') as f:
+            json.dump({"format": "vizen-delta", "version": 1, "since": since, "seq": seq, "changes": changes}, f, separators=(',', ':'))
+        return seq
+
+    def import_changes(self, path):
+        """Merges a delta from export_changes; for each drama the newest change wins.
+        Returns (applied, skipped). Raises OSError/ValueError for unreadable or foreign files."""
+        with open(path, 'r') as f: data = json.load(f)
+        if not isinstance(data, dict) or data.get('format') != "vizen-delta": raise ValueError("Not a Vizen delta file.")
+        applied = 0
+        with self.batch():
+            for c in data.get('changes', []): applied += self._merge_change(c)
+        return applied, len(data.get('changes', [])) - applied
+
+    def _merge_change(self, c):
+        """Last-writer-wins: applies c only if it is newer than the local row or tombstone."""
+        tid = c['id'] if c['op'] == "delete" else c['drama']['id']
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT ts FROM changelog WHERE tmdb_id = ?", (tid,))
+        local = cursor.fetchone()
+        if local and local[0] is not None and local[0] >= c['ts']: return False
+        if c['op'] == "delete":
+            self.delete_drama(tid)
+            # Keep the remote deletion time so the tombstone compares correctly on later merges
+            cursor.execute('''INSERT INTO changelog (tmdb_id, op, ts) VALUES (?, 'delete', ?)
+                ON CONFLICT(tmdb_id) DO UPDATE SET op = 'delete', ts = excluded.ts''', (tid, c['ts']))
+        else:
+            d = c['drama']; self.add_drama(d, d['status'], d.get('current_ep', 0), c['ts'])
+        return True
+
     def export_data(self, path):
         data = self.get_library()
         with open(path, 'w') as f: json.dump(data, f, indent=4)
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""Headless maintenance commands for the Vizen library. Never imports Qt, so it starts instantly.
+
+    python vizen_cli.py list --status watching
+    python vizen_cli.py export backup.json
+    python vizen_cli.py export-changes delta.json --since 42
+    python vizen_cli.py refresh --all
+    python vizen_cli.py prewarm
+    python vizen_cli.py prune --max-age-days 30
+
+Every command prints JSON to stdout.
+"""
+import argparse, hashlib, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseHandler, get_app_folder
+
+CACHE_TTL = 1209600  # Same 14 day freshness window ImageWorker uses
+
+def cache_dir():
+    path = os.path.join(get_app_folder(), 'Cache')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def cache_path(url):
+    # Must match ImageWorker so the GUI picks up files written here
+    return os.path.join(cache_dir(), f"{hashlib.md5(url.encode()).hexdigest()}.jpg")
+
+def chunks(items, size):
+    for i in range(0, len(items), size): yield items[i:i + size]
+
+def emit(data):
+    json.dump(data, sys.stdout, indent=2, ensure_ascii=False); sys.stdout.write("\n")
+
+# --- COMMANDS ---
+def cmd_list(db, args):
+    items = db.get_library(args.status, args.search, args.genre, args.country)
+    emit(items[:args.limit] if args.limit else items)
+
+def cmd_stats(db, args):
+    emit(db.get_stats(args.days))
+
+def cmd_export(db, args):
+    db.export_data(args.path)
+    emit({"exported": len(db.get_library()), "path": os.path.abspath(args.path)})
+
+def cmd_import(db, args):
+    ok = db.import_data(args.path)
+    emit({"imported": ok, "total": len(db.get_library())})
+    return 0 if ok else 1
+
+def cmd_export_changes(db, args):
+    seq = db.export_changes(args.path, args.since)
+    emit({"since": args.since, "seq": seq, "path": os.path.abspath(args.path)})
+
+def cmd_import_changes(db, args):
+    try: applied, skipped = db.import_changes(args.path)
+    except Exception as e: emit({"imported": False, "error": str(e)}); return 1
+    emit({"applied": applied, "skipped": skipped, "seq": db.change_seq()})
+
+def cmd_refresh(db, args):
+    """Re-fetches TMDB metadata, keeping status, progress, rating and last_updated."""
+    from api_handler import TMDBService
+    tmdb = TMDBService()
+    if not tmdb.token: emit({"error": "No TMDB API key configured."}); return 1
+    ids = [d['id'] for d in db.get_library()] if args.all else db.get_incomplete_dramas()
+    updated = failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for batch in chunks(ids, args.batch_size):
+            details = list(pool.map(tmdb.get_detailed_info, batch))
+            with db.batch():
+                for tid, det in zip(batch, details):
+                    if not det: failed += 1; continue
+                    db.update_metadata(det); updated += 1
+    emit({"checked": len(ids), "updated": updated, "failed": failed})
+
+def cmd_airing(db, args):
+    """Runs one airing tracker pass (only shows whose next check is due)."""
+    from api_handler import TMDBService
+    from airing import refresh_airing
+    tmdb = TMDBService()
+    if not tmdb.token: emit({"error": "No TMDB API key configured."}); return 1
+    emit({"updated": refresh_airing(db, tmdb, args.limit)})
+
+def cmd_prewarm(db, args):
+    """Downloads every library poster that is missing or stale in the image cache."""
+    import requests
+    session = requests.Session()
+    now = time.time()
+    urls = [d['poster'] for d in db.get_library() if d.get('poster')]
+    todo = [u for u in urls if not os.path.exists(cache_path(u)) or now - os.path.getmtime(cache_path(u)) >= CACHE_TTL]
+
+    def fetch(url):
+        try:
+            res = session.get(url, timeout=10); res.raise_for_status()
+            with open(cache_path(url), 'wb') as f: f.write(res.content)
+            return True
+        except: return False
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for batch in chunks(todo, args.batch_size): done += sum(pool.map(fetch, batch))
+    emit({"posters": len(urls), "cached": len(urls) - len(todo), "downloaded": done, "failed": len(todo) - done})
+
+def cmd_prune(db, args):
+    """Deletes stale cache files, optionally files no library poster points to, then trims to --max-mb."""
+    folder = cache_dir(); now = time.time()
+    keep = {os.path.basename(cache_path(d['poster'])) for d in db.get_library() if d.get('poster')} if args.orphans else None
+    files, removed, freed = [], 0, 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try: st = os.stat(path)
+        except OSError: continue
+        if now - st.st_mtime > args.max_age_days * 86400 or (keep is not None and name not in keep):
+            try: os.remove(path); removed += 1; freed += st.st_size
+            except OSError: pass
+        else: files.append((st.st_mtime, st.st_size, path))
+    if args.max_mb is not None:
+        total = sum(f[1] for f in files)
+        for mtime, size, path in sorted(files):  # Oldest first
+            if total <= args.max_mb * 1024 * 1024: break
+            try: os.remove(path); removed += 1; freed += size; total -= size
+            except OSError: pass
+    emit({"removed": removed, "freed_bytes": freed})
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="vizen_cli", description="Headless Vizen library tools (JSON output).")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("list", help="Query the library")
+    s.add_argument("--status", default="all", choices=["all", "watching", "plan", "completed"])
+    s.add_argument("--search", default=""); s.add_argument("--genre", default="All Genres"); s.add_argument("--country", default="All Regions")
+    s.add_argument("--limit", type=int, default=0); s.set_defaults(func=cmd_list)
+
+    s = sub.add_parser("stats", help="Library statistics")
+    s.add_argument("--days", type=int, default=30); s.set_defaults(func=cmd_stats)
+
+    s = sub.add_parser("export", help="Write a full JSON backup")
+    s.add_argument("path"); s.set_defaults(func=cmd_export)
+
+    s = sub.add_parser("import", help="Load a JSON backup")
+    s.add_argument("path"); s.set_defaults(func=cmd_import)
+
+    s = sub.add_parser("export-changes", help="Write a delta of changes made after --since")
+    s.add_argument("path"); s.add_argument("--since", type=int, default=0, help="seq printed by the previous export-changes")
+    s.set_defaults(func=cmd_export_changes)
+
+    s = sub.add_parser("import-changes", help="Merge a delta file (newest edit wins)")
+    s.add_argument("path"); s.set_defaults(func=cmd_import_changes)
+
+    s = sub.add_parser("refresh", help="Refresh TMDB metadata (incomplete entries unless --all)")
+    s.add_argument("--all", action="store_true")
+    s.add_argument("--batch-size", type=int, default=50); s.add_argument("--workers", type=int, default=4)
+    s.set_defaults(func=cmd_refresh)
+
+    s = sub.add_parser("airing", help="Update episode counts of airing watching/plan shows that are due")
+    s.add_argument("--limit", type=int, default=40); s.set_defaults(func=cmd_airing)
+
+    s = sub.add_parser("prewarm", help="Download library posters into the image cache")
+    s.add_argument("--batch-size", type=int, default=100); s.add_argument("--workers", type=int, default=8)
+    s.set_defaults(func=cmd_prewarm)
+
+    s = sub.add_parser("prune", help="Remove old or unused cached images")
+    s.add_argument("--max-age-days", type=float, default=CACHE_TTL / 86400)
+    s.add_argument("--max-mb", type=float, default=None)
+    s.add_argument("--orphans", action="store_true", help="Also remove files that are not library posters (browse posters, logos)")
+    s.set_defaults(func=cmd_prune)
+    return p
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(DatabaseHandler(), args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())